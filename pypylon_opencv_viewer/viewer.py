@@ -2,12 +2,53 @@ import cv2
 
 import ipywidgets as widgets
 import warnings
-from pypylon.genicam import LogicalErrorException
+from pypylon.genicam import LogicalErrorException, GenericException, IsWritable
 from pypylon import pylon
 import numpy as np
 import re
 import os
-import datetime
+import time
+import contextlib
+import queue
+import threading
+import concurrent.futures
+import functools
+import sys
+
+_CAMEL_RE = re.compile(r'([a-z])([A-Z])')
+_GRAB_QUEUE_SIZE = 2
+_MISSING = object()
+_GRABBED_IMAGE_NAME = 'BaslerGrabbedImage-'
+
+
+def _poll_key():
+    # pollKey (OpenCV 4.5+) handles window events without waiting at least 1 ms like waitKey
+    if(hasattr(cv2, 'pollKey')):
+        return cv2.pollKey() & 0xFF
+    return cv2.waitKey(1) & 0xFF
+
+
+@functools.lru_cache(maxsize=None)
+def _feature_description(feature_name):
+    # same features are processed again on every set_configuration call
+    return _CAMEL_RE.sub(r'\1 \2', feature_name)
+
+
+def _is_uncompiled_jit_function(function):
+    # numba function can exist only if numba is already imported, so it isn't imported here just for the check
+    if('numba' not in sys.modules):
+        return False
+    try:
+        from numba.core.dispatcher import Dispatcher
+    except ImportError:
+        from numba.dispatcher import Dispatcher
+    return isinstance(function, Dispatcher) and not function.signatures
+
+
+def _release(item):
+    # grab queues carry grab results, processed images, exceptions and None as the end mark
+    if(hasattr(item, 'Release')):
+        item.Release()
 
 
 class BaslerOpenCVViewer:
@@ -26,6 +67,20 @@ class BaslerOpenCVViewer:
         'choice_text': widgets.ToggleButtons,
     }
 
+    # OpenCV names bayer patterns by the second row, so they are shifted against pylon pixel types
+    BAYER_CONVERSIONS = {
+        pylon.PixelType_BayerRG8: cv2.COLOR_BayerBG2BGR,
+        pylon.PixelType_BayerBG8: cv2.COLOR_BayerRG2BGR,
+        pylon.PixelType_BayerGR8: cv2.COLOR_BayerGB2BGR,
+        pylon.PixelType_BayerGB8: cv2.COLOR_BayerGR2BGR,
+    }
+
+    # pixel types, which OpenCV works with directly, so grabbed images don't need to be converted
+    OPENCV_PIXEL_TYPES = (pylon.PixelType_BGR8packed, pylon.PixelType_Mono8)
+
+    SAVE_FORMATS = ('jpg', 'png', 'bmp')
+    STREAM_PARAMS = ('MaxNumBuffer', 'SocketBufferSize', 'GevSCPSPacketSize', 'GevSCPD')
+
     def __init__(self, camera):
         """
 
@@ -39,15 +94,42 @@ class BaslerOpenCVViewer:
         self._camera = camera
 
         self._interact_camera_widgets = {}
+        self._pylon_nodes = {}
+        self._last_widget_values = {}
         self._dependecies = {}
+        self._dependency_triggers = {}
+        self._widget_names = {}
+        # errors of writing widgets' values to camera are shown in the notebook under the panel
+        self._output = widgets.Output()
         self._default_user_set = None
+        self._current_user_set = None
         self._disable_updates = False
         self._default_layout = {"width": '100%', "height": '50px', "align_items": "center"}
         self._default_style = {'description_width': 'initial'}
+        # widgets without own layout share one layout object, so it isn't created for every single widget
+        self._default_layout_obj = widgets.Layout(**self._default_layout)
         self._features_layout = []
         self._actions_layout = [("StatusLabel"), ("SaveConfig", "LoadConfig", "ContinuousShot", "SingleShot"), ("UserSet")]
         self._impro_function = None
         self._impro_own_window = False
+        self._copy_image = False
+        self._impro_workers = 1
+        self._use_opencl = False
+        self._image_widget = None
+        self._display_quality_widget = None
+        self._display_interval = 1 / 30
+        self._stream_params = {}
+        self._display_thread = None
+        self._stop_shot = threading.Event()
+        self._save_requested = threading.Event()
+        self._last_image = None
+        # grabbed images are written in background, so saving doesn't stall displaying
+        self._image_saver = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+        self._image_encoder = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self._encoding = None
+        self._save_format = 'jpg'
+        self._save_params = [cv2.IMWRITE_JPEG_QUALITY, 90]
+        self._converter = None
 
     def set_camera(self, camera):
         """ Sets Basler Pylon opened camera instance.
@@ -120,6 +202,7 @@ class BaslerOpenCVViewer:
             actions_layout: list of tuples (optional, default is one widget per row)
                 List of actions' widgets' name for reordering. Each tuple represents one row.
                 Available widgets are StatusLabel, SaveConfig, LoadConfig, ContinuousShot, SingleShot, "UserSet"
+                and StopShot, SaveImage, DisplayQuality, when panel is shown with use_widget_display=True
                 Example: 
                     "action_layout": [
                         ("StatusLabel"), 
@@ -138,13 +221,14 @@ class BaslerOpenCVViewer:
 
 
         new_interact_camera_widgets = {}
+        new_pylon_nodes = {}
         dependencies = {}
         if(not isinstance(configuration, dict)):
             raise ValueError("Given configuration must be dict type")
         
         if("features" in configuration):
             for feature in configuration["features"]:
-                self._process_feature(feature, new_interact_camera_widgets, dependencies)
+                self._process_feature(feature, new_interact_camera_widgets, new_pylon_nodes, dependencies)
         else:
             warnings.warn("Configuration does not contain attribute 'features'")
         
@@ -158,14 +242,26 @@ class BaslerOpenCVViewer:
         self._add_user_actions_to_widgets()
         self._dependecies = dependencies
         self._interact_camera_widgets = new_interact_camera_widgets
+        self._pylon_nodes = new_pylon_nodes
+        self._last_widget_values = {}
+
+        # only the changed widget's value is written to the camera
+        self._widget_names = {}
+        for widget_name, widget in self._interact_camera_widgets.items():
+            self._widget_names[widget] = widget_name
+            widget.observe(self._on_widget_value_change, names='value')
 
+        # widgets without dependent widgets aren't observed at all
+        self._dependency_triggers = {}
         for trigger in self._dependecies.keys():
             if(trigger not in self._interact_camera_widgets):
                 raise ValueError(f"Unknown widget {trigger} listed in dependecies")
-            self._interact_camera_widgets[trigger].observe(lambda x, trigger=trigger: self._event_handler_for_dependencies(trigger, x), names='value')
-            self._event_handler_for_dependencies(trigger, {"new": self._interact_camera_widgets[trigger].value})
+            trigger_widget = self._interact_camera_widgets[trigger]
+            self._dependency_triggers[trigger_widget] = trigger
+            trigger_widget.observe(self._on_dependency_trigger_change, names='value')
+            self._event_handler_for_dependencies(trigger, {"new": trigger_widget.value})
 
-    def _process_feature(self, feature, new_interact_camera_widgets, dependencies):
+    def _process_feature(self, feature, new_interact_camera_widgets, new_pylon_nodes, dependencies):
         widget_kwargs = {}
 
         if(not isinstance(feature, dict)):
@@ -187,16 +283,26 @@ class BaslerOpenCVViewer:
         if type_name is None:
             raise ValueError("'type' attribute can't be None")
 
+        if(type_name == "h_box"):
+            # container has neither own widget nor camera node, only its content features have
+            content = feature.get('content')
+            if(content is None):
+                raise ValueError("Attribute 'content' cannot be empty for type 'h_box'")
+            for content_feature in content:
+                self._process_feature(content_feature, new_interact_camera_widgets, new_pylon_nodes, dependencies)
+            return
+
         widget_obj = self.WIDGET_TYPES.get(type_name)
         if widget_obj is None:
             raise ValueError("Widget type name '{}' is not valid.".format(type_name))
+
+        try:
+            pylon_feature = getattr(self._camera, feature_name)
+        except LogicalErrorException:
+            raise ValueError("Camera doesn't have attribute '{}'".format(feature_name)) from None
+        widget_kwargs['value'] = feature['value'] if 'value' in feature else pylon_feature.GetValue()
         
         if(type_name in ['int', 'float', 'int_text', 'float_text']): 
-            try:
-                pylon_feature = getattr(self._camera, feature_name)
-            except LogicalErrorException:
-                raise ValueError("Camera doesn't have attribute '{}'".format(feature_name)) from None
-            widget_kwargs['value'] = feature.get('value', pylon_feature.GetValue())
             step = feature.get('step')
             if step is None:
                 try:
@@ -205,27 +311,13 @@ class BaslerOpenCVViewer:
                     step = 1
             widget_kwargs['step'] = step
 
-            max_value = feature.get('max', pylon_feature.GetMax())
-            max_value = (pylon_feature.GetMax(), max_value)[max_value <= pylon_feature.GetMax()]
-            widget_kwargs['max'] = max_value
+            feature_max = pylon_feature.GetMax()
+            widget_kwargs['max'] = min(feature.get('max', feature_max), feature_max)
 
-            min_value = feature.get('min', pylon_feature.GetMin())
-            min_value = (pylon_feature.GetMin(), min_value)[min_value <= pylon_feature.GetMin()]
-            widget_kwargs['min'] = min_value
-
-        elif(type_name == "bool"):
-            try:
-                pylon_feature = getattr(self._camera, feature_name)
-            except LogicalErrorException:
-                raise ValueError("Camera doesn't have attribute '{}'".format(feature_name)) from None
-            widget_kwargs['value'] = feature.get('value', pylon_feature.GetValue())
+            feature_min = pylon_feature.GetMin()
+            widget_kwargs['min'] = max(feature.get('min', feature_min), feature_min)
 
         elif(type_name == "choice_text"):
-            try:
-                pylon_feature = getattr(self._camera, feature_name)
-            except LogicalErrorException:
-                raise ValueError("Camera doesn't have attribute '{}'".format(feature_name)) from None
-            widget_kwargs['value'] = feature.get('value', pylon_feature.GetValue())
             if('options' not in feature or not isinstance(feature['options'], list)):
                 raise ValueError("Widget 'choice_text' has mandatory attribute 'options' (list)")
             elif(not feature.get('options')):
@@ -235,15 +327,8 @@ class BaslerOpenCVViewer:
             if(widget_kwargs['value'] not in widget_kwargs['options']):
                 warnings.warn("Current value of feature '{}' is '{}', but this value is not in options.".format(feature_name, widget_kwargs['value']))
                 widget_kwargs['value'] = widget_kwargs['options'][0]
-        
-        elif(type_name == "h_box"):
-            content = feature.get('content')
-            if(content is None):
-                raise ValueError("Attribute 'content' cannot be empty for type 'h_box'")
-            for content_feature in content:
-                self._process_feature(content_feature, new_interact_camera_widgets, dependencies)
 
-        widget_kwargs['description'] = re.sub('([a-z])([A-Z])', r'\1 \2', feature_name)
+        widget_kwargs['description'] = _feature_description(feature_name)
         if('unit' in feature):
             widget_kwargs['description'] += " ["+feature['unit']+"]"
         if(type_name != "bool"):
@@ -263,60 +348,97 @@ class BaslerOpenCVViewer:
                 raise ValueError("Attribute 'layout' must be dict type")
         else:
             layout_dict = {}
-        widget_kwargs['layout'] = widgets.Layout(**{**self._default_layout, **layout_dict})
+        if(layout_dict):
+            widget_kwargs['layout'] = widgets.Layout(**{**self._default_layout, **layout_dict})
+        else:
+            widget_kwargs['layout'] = self._default_layout_obj
 
         new_interact_camera_widgets[feature_name] = widget_obj(**widget_kwargs)
+        # node is looked up once here, widgets' changes are written directly to it
+        new_pylon_nodes[feature_name] = pylon_feature
+
 
+    def _on_widget_value_change(self, change):
+        with self._output:
+            self._update_values_from_widgets(**{self._widget_names[change['owner']]: change['new']})
+
+    def _on_dependency_trigger_change(self, change):
+        with self._output:
+            self._event_handler_for_dependencies(self._dependency_triggers[change['owner']], change)
 
     def _event_handler_for_dependencies(self, trigger, change):        
         for feature, condition in self._dependecies[trigger].items():
-            self._interact_camera_widgets[feature].disabled = (change['new'] != condition)
+            widget = self._interact_camera_widgets[feature]
+            was_disabled = widget.disabled
+            widget.disabled = (change['new'] != condition)
+            if(was_disabled and not widget.disabled and not self._disable_updates):
+                # value of disabled widget wasn't written, so the displayed one is written now
+                self._last_widget_values.pop(feature, None)
+                self._update_values_from_widgets(**{feature: widget.value})
 
     def _button_clicked(self, button):        
         if(button.description == "Load configuration"):
-            self._interact_action_widgets["StatusLabel"].value = f"Status: Loading configuration from {self._camera.UserSetSelector.GetValue()}"
+            self._interact_action_widgets["StatusLabel"].value = f"Status: Loading configuration from {self._current_user_set}"
             self._camera.UserSetLoad()
             self._update_values_from_camera()
-            self._interact_action_widgets["StatusLabel"].value = f"Status: Configuration was loaded from {self._camera.UserSetSelector.GetValue()}"
+            self._interact_action_widgets["StatusLabel"].value = f"Status: Configuration was loaded from {self._current_user_set}"
         elif(button.description == "Save configuration"):
-            self._interact_action_widgets["StatusLabel"].value = f"Status: Saving configuration to {self._camera.UserSetSelector.GetValue()}"
+            self._interact_action_widgets["StatusLabel"].value = f"Status: Saving configuration to {self._current_user_set}"
             self._camera.UserSetSave()
-            self._interact_action_widgets["StatusLabel"].value = f"Status: Configuration was saved to {self._camera.UserSetSelector.GetValue()}"
+            self._interact_action_widgets["StatusLabel"].value = f"Status: Configuration was saved to {self._current_user_set}"
         elif(button.description == "Continuous shot"):
             self._run_continuous_shot(window_size=self._window_size, image_folder=self._image_folder)
         elif(button.description == "Single shot"):
             self._run_single_shot(window_size=self._window_size, image_folder=self._image_folder)
+        elif(button.description == "Stop shot"):
+            self._stop_continuous_shot()
+            self._interact_action_widgets["StatusLabel"].value = f"Status: The continuous shot was stopped."
+        elif(button.description == "Save image"):
+            if(self._is_continuous_shot_running()):
+                # the next displayed image is saved by the display thread
+                self._save_requested.set()
+            elif(self._last_image is not None):
+                self._save_grabbed_image(self._last_image, self._save_prefix)
+            else:
+                self._interact_action_widgets["StatusLabel"].value = f"Status: There is no grabbed image to save."
+
+    def _on_user_set_change(self, change):
+        self._camera.UserSetSelector.SetValue(change['new'])
+        self._current_user_set = change['new']
 
     def _add_user_actions_to_widgets(self):
         self._interact_action_widgets = {}
+        # selected user set is kept here for status messages, so it isn't read from camera again
+        self._current_user_set = self._camera.UserSetSelector.GetValue()
         if(self._default_user_set is None):
             self._interact_action_widgets["UserSet"] = widgets.ToggleButtons(options=['UserSet1', 'UserSet2', 'UserSet3'], 
-                                                                            value=self._camera.UserSetSelector.GetValue(),
+                                                                            value=self._current_user_set,
                                                                             description='User Set', 
-                                                                            layout=widgets.Layout(**self._default_layout),
+                                                                            layout=self._default_layout_obj,
                                                                             style={**self._default_style, **{"button_width": "120px"}})
-            self._interact_action_widgets["UserSet"].observe(lambda x: self._camera.UserSetSelector.SetValue(x['new']), names='value')
+            self._interact_action_widgets["UserSet"].observe(self._on_user_set_change, names='value')
         else:
             self._camera.UserSetSelector.SetValue(self._default_user_set)
+            self._current_user_set = self._default_user_set
         self._interact_action_widgets["LoadConfig"] = widgets.Button(description='Load configuration',
                                                                     button_style='warning', 
                                                                     icon='cloud-upload',
                                                                     tooltip='Load configuration from selected UserSet',
-                                                                    layout=widgets.Layout(**self._default_layout),
+                                                                    layout=self._default_layout_obj,
                                                                     style={**self._default_style, **{"button_width": "100px"}})
         self._interact_action_widgets["LoadConfig"].on_click(self._button_clicked)
         self._interact_action_widgets["SaveConfig"] = widgets.Button(description='Save configuration',
                                                                     button_style='warning',
                                                                     icon='save',
                                                                     tooltip='Save configuration to selected UserSet',
-                                                                    layout=widgets.Layout(**self._default_layout),
+                                                                    layout=self._default_layout_obj,
                                                                     style={**self._default_style, **{"button_width": "100px"}})
         self._interact_action_widgets["SaveConfig"].on_click(self._button_clicked)
         self._interact_action_widgets["ContinuousShot"] = widgets.Button(description='Continuous shot',
                                                                     button_style='success',
                                                                     icon='film',
                                                                     tooltip='Grab and display continuous stream',
-                                                                    layout=widgets.Layout(**self._default_layout),
+                                                                    layout=self._default_layout_obj,
                                                                     style={**self._default_style, **{"button_width": "100px"}})
         self._interact_action_widgets["ContinuousShot"].on_click(self._button_clicked)
         
@@ -324,24 +446,38 @@ class BaslerOpenCVViewer:
                                                                     button_style='success',
                                                                     icon='image',
                                                                     tooltip='Grab one image and display',
-                                                                    layout=widgets.Layout(**self._default_layout),
+                                                                    layout=self._default_layout_obj,
                                                                     style={**self._default_style, **{"button_width": "100px"}})
         self._interact_action_widgets["SingleShot"].on_click(self._button_clicked)
         self._interact_action_widgets["StatusLabel"] = widgets.Label(value="Status: Connection was established",
-                                                                layout=widgets.Layout(**{**self._default_layout}),
+                                                                layout=self._default_layout_obj,
                                                                 style=self._default_style)
 
-    def set_impro_function(self, impro_function, own_window=False):
+    def set_impro_function(self, impro_function, own_window=False, copy_image=False, impro_workers=1, use_opencl=False):
         """ Sets image processing function in wich grabbed image would be passed. 
 
         Parameters
         ----------
         impro_function : function
             Image processing function which takes one positional argument: grabbed OpenCV image.
+            Image is BGR, only for cameras with Mono8 pixel format it's single channel grayscale.
             Given function must either return processed image (for default own_window=False) 
             or display it using cv2.namedWindow (for own_window=True)
         own_window: bool (default False)
-            Specify whenever impro_function opens own cv2.namedWindow
+            Specify whenever impro_function opens own cv2.namedWindow, not allowed with use_widget_display=True
+        copy_image: bool (default False)
+            During continuous shot impro_function gets a view onto the grabbed frame buffer, which is valid only
+            until the function returns. Set to True if impro_function keeps references to the given image.
+        impro_workers: int (default 1)
+            Number of threads running impro_function (own_window=False only) on successive frames during continuous
+            shot, while the previous image is displayed. More threads help only if impro_function releases the GIL,
+            as OpenCV and most of NumPy functions do. Such vectorized functions need no compilation, but pixel-level
+            Python loops should be compiled by BaslerOpenCVViewer.jit_impro (Numba).
+        use_opencl: bool (default False)
+            Process images by OpenCV transparent API on OpenCL device (e.g. integrated GPU). During continuous shot
+            Bayer frames are demosaiced on the device and impro_function gets cv2.UMat, which it may also return.
+            OpenCV functions called on UMat run on the device, image is downloaded only once for displaying.
+            Requires OpenCV built with OpenCL, otherwise it's ignored with a warning.
 
         Returns
         -------
@@ -349,24 +485,63 @@ class BaslerOpenCVViewer:
         """
         if impro_function is not None and not callable(impro_function):
             raise ValueError("Object {} is not callable.".format(impro_function))
+        if(impro_workers < 1):
+            raise ValueError("Number of impro workers must be at least 1.")
+        if(own_window and self._image_widget is not None):
+            raise ValueError("Impro function with own window can't be used with widget display.")
+        if(_is_uncompiled_jit_function(impro_function)):
+            # compile numba function now, otherwise the first grabbed frame would wait for compilation
+            shape = (self._camera.Height.GetValue(), self._camera.Width.GetValue())
+            if(self._camera.PixelFormat.GetValue() != 'Mono8'):
+                shape += (3,)
+            impro_function(np.zeros(shape, dtype=np.uint8))
         self._impro_function = impro_function
         self._impro_own_window = own_window
+        self._copy_image = copy_image
+        self._impro_workers = impro_workers
+        if(use_opencl and not cv2.ocl.haveOpenCL()):
+            warnings.warn("OpenCL is not available in OpenCV, images are processed on CPU")
+            use_opencl = False
+        if(use_opencl):
+            cv2.ocl.setUseOpenCL(True)
+        self._use_opencl = use_opencl
+
+    @staticmethod
+    def jit_impro(impro_function):
+        """ Compiles image processing function with pixel-level Python loops by Numba.
+        Function is compiled in set_impro_function, so it doesn't delay the first grabbed frame.
+        Requires numba package to be installed.
+
+        Parameters
+        ----------
+        impro_function : function
+            Image processing function, loops over rows can be parallelized by numba.prange
+
+        Returns
+        -------
+        Numba compiled impro_function
+        """
+        try:
+            import numba
+        except ImportError:
+            raise ImportError("jit_impro requires numba package, install it by 'pip install numba'") from None
+        # nogil lets more impro workers run the compiled function at once
+        return numba.njit(parallel=True, fastmath=True, cache=True, nogil=True)(impro_function)
 
     def _order_widgets_to_rows(self, rows, wdgts):
-        items_rearranged = []
+        items_rearranged = set()
         row_widgets = []
         h_box_layout = widgets.Layout(display='flex', flex_flow='row', justify_items='center', justify_content="flex-start", width='100%')
         for items_in_row in rows:
-            for item in items_in_row:
-                if(item not in wdgts):
-                    break
-            else:
-                items_rearranged.extend(items_in_row)
+            if(all(item in wdgts for item in items_in_row)):
+                items_rearranged.update(items_in_row)
                 row_widgets.append(widgets.HBox([wdgts[item] for item in items_in_row], layout=h_box_layout))       
 
         return row_widgets + [w for key, w in wdgts.items() if key not in items_rearranged] 
 
-    def show_interactive_panel(self, window_size=None, image_folder='.'):
+    def show_interactive_panel(self, window_size=None, image_folder='.', use_widget_display=False, max_display_fps=30,
+                               save_format='jpg', jpeg_quality=90, png_compression=1, display_quality=80,
+                               stream_params=None):
         """ Creates Jupyter notebook widgets with all specified features value controls and displays it. 
 
         Parameters
@@ -375,12 +550,72 @@ class BaslerOpenCVViewer:
             Size of displaying OpenCV window(raw camera output), if image processing function is not specified.
         image_folder : str
             Path to image folder to save grabbed image
+        use_widget_display : bool (default False)
+            Display grabbed images as JPEG in an image widget under the panel instead of OpenCV window.
+            Continuous shot is then stopped by "Stop shot" button (StopShot in actions_layout) and displayed
+            image is saved by "Save image" button (SaveImage in actions_layout).
+            Impro function with own_window=True can't be used with widget display.
+        max_display_fps : number (default 30)
+            Maximum rate of images sent to the image widget, other grabbed images are dropped.
+            Used only with use_widget_display=True.
+        save_format : str (default 'jpg')
+            Format of saved grabbed images, allowed values are {"jpg", "png", "bmp"}
+        jpeg_quality : int (default 90)
+            Quality (0-100) of grabbed images saved as jpg
+        png_compression : int (default 1)
+            Compression level (0-9) of grabbed images saved as png, higher levels give only slightly smaller
+            files, but take much longer to write
+        display_quality : int (default 80)
+            Initial JPEG quality (0-100) of images sent to the image widget, lower quality needs less bandwidth.
+            It can be tuned by "Display quality" slider (DisplayQuality in actions_layout).
+            Used only with use_widget_display=True.
+        stream_params : dict (optional)
+            Stream grabber parameters applied before continuous shot, allowed keys are:
+                MaxNumBuffer : int (default 10)
+                    Number of buffers used for grabbing, at least 3 + impro_workers buffers are used, because
+                    the latest frames are held by the viewer and impro workers
+                SocketBufferSize : int (default maximum)
+                    Socket buffer size in KB, GigE cameras only
+                GevSCPSPacketSize : int (default camera value)
+                    Packet size in bytes, GigE cameras only, sizes over 1500 require jumbo frames on network card
+                GevSCPD : int (default camera value)
+                    Inter-packet delay in ticks, GigE cameras only, raise it when frames are dropped by a
+                    network shared by more cameras
         """
   
         self._window_size = window_size
         self._image_folder = image_folder
+        self._save_prefix = os.path.join(image_folder, _GRABBED_IMAGE_NAME)
+        self._display_interval = 1 / max_display_fps
+        stream_params = {} if stream_params is None else stream_params
+        for name in stream_params:
+            if(name not in self.STREAM_PARAMS):
+                raise ValueError("Stream parameter '{}' is not valid.".format(name))
+        self._stream_params = stream_params
+        if(save_format not in self.SAVE_FORMATS):
+            raise ValueError("Save format '{}' is not valid.".format(save_format))
+        self._save_format = save_format
+        if(save_format == 'jpg'):
+            self._save_params = [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality]
+        elif(save_format == 'png'):
+            self._save_params = [cv2.IMWRITE_PNG_COMPRESSION, png_compression]
+        else:
+            self._save_params = []
         if self._camera is None or not self._camera.IsOpen():
             raise ValueError("Camera object {} is closed.".format(self._camera))
+        if(use_widget_display and self._impro_own_window):
+            # shot runs on a background thread, OpenCV window opened there wouldn't get any events to repaint
+            raise ValueError("Impro function with own window can't be used with widget display.")
+
+        self._stop_continuous_shot()
+        if(use_widget_display):
+            self._add_widget_display_to_widgets(window_size, display_quality)
+        else:
+            self._image_widget = None
+            self._display_quality_widget = None
+            self._interact_action_widgets.pop("StopShot", None)
+            self._interact_action_widgets.pop("SaveImage", None)
+            self._interact_action_widgets.pop("DisplayQuality", None)
         
         row_widgets = []
         row_widgets.extend(self._order_widgets_to_rows(
@@ -393,114 +628,442 @@ class BaslerOpenCVViewer:
         ui = widgets.VBox(row_widgets,
                 layout=widgets.Layout(display='flex', flex_flow='column', align_items='center', align_content="center",  width='100%')
                 )
-        w = widgets.interactive_output(self._update_values_from_widgets, {**self._interact_camera_widgets})
-        display(w, ui)
+        # widgets' values are written to camera once, then only on change
+        self._output.clear_output()
+        with self._output:
+            self._update_values_from_widgets(**{name: widget.value for name, widget in self._interact_camera_widgets.items()})
+        if(self._image_widget is not None):
+            display(self._output, ui, self._image_widget)
+        else:
+            display(self._output, ui)
+
+    def _add_widget_display_to_widgets(self, window_size, display_quality):
+        if(window_size is not None):
+            image_layout = widgets.Layout(width=f"{window_size[0]}px", height=f"{window_size[1]}px")
+        else:
+            image_layout = widgets.Layout(width='100%')
+        self._image_widget = widgets.Image(format='jpeg', layout=image_layout)
+        self._interact_action_widgets["StopShot"] = widgets.Button(description='Stop shot',
+                                                                    button_style='danger',
+                                                                    icon='stop',
+                                                                    tooltip='Stop continuous stream',
+                                                                    layout=self._default_layout_obj,
+                                                                    style={**self._default_style, **{"button_width": "100px"}})
+        self._interact_action_widgets["StopShot"].on_click(self._button_clicked)
+        self._interact_action_widgets["SaveImage"] = widgets.Button(description='Save image',
+                                                                    button_style='info',
+                                                                    icon='download',
+                                                                    tooltip='Save displayed image to image folder',
+                                                                    layout=self._default_layout_obj,
+                                                                    style={**self._default_style, **{"button_width": "100px"}})
+        self._interact_action_widgets["SaveImage"].on_click(self._button_clicked)
+        # kept aside like the image widget, action widgets are recreated by set_configuration
+        self._display_quality_widget = widgets.IntSlider(value=display_quality,
+                                                         min=10,
+                                                         max=100,
+                                                         step=5,
+                                                         description='Display quality:',
+                                                         layout=self._default_layout_obj,
+                                                         style=self._default_style)
+        self._interact_action_widgets["DisplayQuality"] = self._display_quality_widget
 
     def _update_values_from_widgets(self, **kwargs):
         if(not self._disable_updates):
+            locked_changes = {}
             for widget_name, value in kwargs.items():
-                if(not self._interact_camera_widgets[widget_name].disabled):
-                    setattr(self._camera, widget_name, value)
+                # values, which are already written to camera, are skipped
+                if(self._interact_camera_widgets[widget_name].disabled or
+                        self._last_widget_values.get(widget_name, _MISSING) == value):
+                    continue
+                node = self._pylon_nodes[widget_name]
+                if(IsWritable(node)):
+                    node.SetValue(value)
+                elif(node.GetValue() != value):
+                    locked_changes[widget_name] = value
+                    continue
+                self._last_widget_values[widget_name] = value
+
+            if(locked_changes):
+                # some features (e.g. Width) can't be changed while grabbing, so continuous shot is restarted,
+                # features like exposure or gain are written without stopping it
+                restart = self._is_continuous_shot_running()
+                if(restart):
+                    self._stop_continuous_shot()
+                for widget_name, value in locked_changes.items():
+                    self._pylon_nodes[widget_name].SetValue(value)
+                    self._last_widget_values[widget_name] = value
+                if(restart):
+                    self._run_continuous_shot(window_size=self._window_size, image_folder=self._image_folder)
 
     def _update_values_from_camera(self):
         self._disable_updates = True
-        for widget_name, widget in self._interact_camera_widgets.items():
-            widget.value = getattr(self._camera, widget_name).GetValue()
-        self._disable_updates = False
+        try:
+            # widgets' observers are notified once all the values are set, instead of after every single one
+            with contextlib.ExitStack() as held_notifications:
+                for widget_name, widget in self._interact_camera_widgets.items():
+                    held_notifications.enter_context(widget.hold_trait_notifications())
+                    widget.value = self._pylon_nodes[widget_name].GetValue()
+                    self._last_widget_values[widget_name] = widget.value
+        finally:
+            self._disable_updates = False
 
     def _run_continuous_shot(self, grab_strategy=pylon.GrabStrategy_LatestImageOnly,
                                         window_size=None, image_folder='.'):
+        if(self._is_continuous_shot_running()):
+            # camera is already streaming with current configuration, there is nothing to restart
+            return
+        self._stop_continuous_shot()
         self._camera.StopGrabbing()
+        self._configure_stream_grabber(self._stream_params)
+        self._stop_shot = threading.Event()
+        self._save_requested.clear()
+        self._last_image = None
+        # path of saved images is joined once for the whole shot
+        save_prefix = os.path.join(image_folder, _GRABBED_IMAGE_NAME)
 
-        # converting to opencv bgr format
-        converter = pylon.ImageFormatConverter()
-        converter.OutputPixelFormat = pylon.PixelType_BGR8packed
-        converter.OutputBitAlignment = pylon.OutputBitAlignment_MsbAligned
+        if(self._image_widget is not None):
+            # widgets' events are handled by the kernel thread, so it can't be blocked by displaying
+            self._display_thread = threading.Thread(target=self._continuous_shot_loop,
+                                                    args=(grab_strategy, save_prefix), daemon=True)
+            self._display_thread.start()
+            return
 
         if(not self._impro_own_window):
-            cv2.namedWindow('camera_image', cv2.WINDOW_NORMAL | cv2.WINDOW_GUI_NORMAL)
-            if(window_size is not None):
-                cv2.resizeWindow('camera_image', window_size[0], window_size[1])
+            self._open_window(window_size)
+        self._continuous_shot_loop(grab_strategy, save_prefix)
 
-        self._camera.StartGrabbing(grab_strategy)
+    def _open_window(self, window_size):
+        # window is kept open between shots and closed by close(), namedWindow does nothing if it already exists
+        cv2.namedWindow('camera_image', cv2.WINDOW_NORMAL | cv2.WINDOW_GUI_NORMAL)
+        if(window_size is not None):
+            cv2.resizeWindow('camera_image', window_size[0], window_size[1])
+
+    def _configure_stream_grabber(self, stream_params):
+        # queued frames and frames displayed or processed by each impro worker are zero-copy views holding
+        # pylon buffers, so the driver needs at least one more buffer to keep grabbing meanwhile
+        self._camera.MaxNumBuffer = max(stream_params.get('MaxNumBuffer', 10), _GRAB_QUEUE_SIZE + 1 + self._impro_workers)
+        # following nodes exist only for GigE cameras, packet size isn't raised to maximum by default,
+        # because it requires jumbo frames enabled on network card
+        for name in ('GevSCPSPacketSize', 'GevSCPD'):
+            if(name not in stream_params):
+                continue
+            try:
+                getattr(self._camera, name).SetValue(stream_params[name])
+            except (GenericException, AttributeError):
+                warnings.warn("{} {} can't be set for camera {}".format(name, stream_params[name], self._camera))
         try:
-            while(self._camera.IsGrabbing()):
-                grab_result = self._camera.RetrieveResult(5000, pylon.TimeoutHandling_ThrowException)
+            socket_buffer = self._camera.StreamGrabber.SocketBufferSize
+            socket_buffer.SetValue(stream_params.get('SocketBufferSize', socket_buffer.GetMax()))
+        except (GenericException, AttributeError):
+            # maximum is only a default, so it's skipped silently for cameras without socket buffer
+            if('SocketBufferSize' in stream_params):
+                warnings.warn("SocketBufferSize {} can't be set for camera {}".format(stream_params['SocketBufferSize'],
+                                                                                     self._camera))
+
+    def _is_continuous_shot_running(self):
+        return self._display_thread is not None and self._display_thread.is_alive()
+
+    def _stop_continuous_shot(self):
+        self._stop_shot.set()
+        if(self._display_thread is not None):
+            self._display_thread.join()
+            self._display_thread = None
+
+    def _continuous_shot_loop(self, grab_strategy, save_prefix):
+        stop_shot = self._stop_shot
+        # frames are grabbed on a separate thread, so a slow display doesn't hold back the pylon buffers,
+        # the queue keeps only the latest frames and older ones are dropped
+        frames = queue.Queue(maxsize=_GRAB_QUEUE_SIZE)
+        threads = [threading.Thread(target=self._grab_loop, args=(frames, stop_shot), daemon=True)]
+        if(self._impro_function is not None and not self._impro_own_window):
+            # impro function processes the next frames on its own threads, while the previous one is displayed,
+            # own window impro function stays on this thread, because OpenCV windows are thread-affine
+            images = queue.Queue(maxsize=self._impro_workers)
+            threads.extend(threading.Thread(target=self._impro_loop, args=(frames, images, stop_shot), daemon=True)
+                           for _ in range(self._impro_workers))
+        else:
+            images = frames
 
-                if grab_result.GrabSucceeded():
-                    # Access the image data
-                    image = converter.Convert(grab_result)
-                    img = image.GetArray()
-
-                    if(self._impro_own_window):
-                        self._impro_function(img)
-                    elif(self._impro_function is not None):
-                        img = self._impro_function(img)
-                        if(not isinstance(img, np.ndarray)):
-                            cv2.destroyAllWindows()
-                            raise ValueError("The given impro_function must return a numpy array when own_window=False")
-                        cv2.imshow('camera_image', img)
-                    else:
-                        cv2.imshow('camera_image', img)
-                    k = cv2.waitKey(1) & 0xFF
-                    if(k == ord('s') and self._impro_own_window is False):
-                        path = os.path.join(image_folder, 'BaslerGrabbedImage-' +
-                            str(int(datetime.datetime.now().timestamp()))+'.png')
-                        cv2.imwrite(path, img)
-                        self._interact_action_widgets["StatusLabel"].value = f"Status: Grabbed image was saved to {path}"
-                    elif k == ord('q'):
+        next_display = time.monotonic()
+        last_image_number = -1
+        self._camera.StartGrabbing(grab_strategy)
+        for thread in threads:
+            thread.start()
+        try:
+            while(not stop_shot.is_set()):
+                if(self._image_widget is not None):
+                    # browser can't show frames faster anyway, meanwhile grab thread keeps only the latest ones
+                    delay = next_display - time.monotonic()
+                    if(delay > 0 and stop_shot.wait(delay)):
                         break
-                grab_result.Release()
+                try:
+                    item = images.get(timeout=0.01)
+                except queue.Empty:
+                    # keep OpenCV window responsive while waiting for the next frame
+                    if(self._image_widget is None and _poll_key() == ord('q')):
+                        break
+                    continue
+                if(item is None):
+                    break
+                if(isinstance(item, Exception)):
+                    raise item
+
+                next_display = time.monotonic() + self._display_interval
+                if(isinstance(item, tuple)):
+                    # already processed by an impro thread, workers may finish out of order, older images are skipped
+                    image_number, img = item
+                    if(image_number < last_image_number):
+                        continue
+                    last_image_number = image_number
+                    k = self._display_frame(img, save_prefix)
+                    del img
+                else:
+                    try:
+                        # Access the image data
+                        with self._bgr_image(item, copy=self._copy_image, umat=self._use_opencl) as img:
+                            k = self._display_frame(self._apply_impro_function(img), save_prefix)
+                            del img
+                    finally:
+                        item.Release()
+                if(k == ord('q')):
+                    break
+        except Exception as e:
+            if(self._image_widget is None):
+                raise
+            # nobody would see exception raised in the display thread
+            self._interact_action_widgets["StatusLabel"].value = f"Status: The continuous shot has failed: {e}"
         finally:
-            cv2.destroyAllWindows()
+            stop_shot.set()
             self._camera.StopGrabbing()
+            for thread in threads:
+                thread.join()
+            for leftovers in {frames, images}:
+                while(not leftovers.empty()):
+                    _release(leftovers.get_nowait())
 
-    def _run_single_shot(self, window_size=None, image_folder='.'):
-        self._camera.StopGrabbing()
+    def _grab_loop(self, frames, stop_grabbing):
+        try:
+            while(not stop_grabbing.is_set() and self._camera.IsGrabbing()):
+                grab_result = self._camera.RetrieveResult(5000, pylon.TimeoutHandling_ThrowException)
+                if(grab_result.GrabSucceeded()):
+                    self._put_latest(frames, grab_result)
+                else:
+                    grab_result.Release()
+        except Exception as e:
+            # StopGrabbing interrupts a pending RetrieveResult, that is not an error
+            if(not stop_grabbing.is_set()):
+                self._put_latest(frames, e)
+                return
+        self._put_latest(frames, None)
+
+    @staticmethod
+    def _put_latest(frames, item):
+        while True:
+            try:
+                frames.put_nowait(item)
+                return
+            except queue.Full:
+                pass
+            try:
+                _release(frames.get_nowait())
+            except queue.Empty:
+                # impro workers took the queued frames meanwhile
+                pass
+
+    def _impro_loop(self, frames, images, stop_shot):
+        # every impro worker converts frames by its own converter, pylon converter isn't documented as thread-safe
+        converter = self._create_converter()
+        try:
+            while(not stop_shot.is_set()):
+                try:
+                    grab_result = frames.get(timeout=0.01)
+                except queue.Empty:
+                    continue
+                if(grab_result is None or isinstance(grab_result, Exception)):
+                    self._put_waiting(images, grab_result, stop_shot)
+                    return
+                try:
+                    with self._bgr_image(grab_result, copy=self._copy_image, umat=self._use_opencl,
+                                         converter=converter) as img:
+                        img = self._apply_impro_function(img)
+                        # returned image mustn't refer to the frame buffer, which is released below
+                        if(not img.flags.owndata):
+                            img = img.copy()
+                    image_number = grab_result.GetImageNumber()
+                finally:
+                    grab_result.Release()
+                # waits until the previous images are taken, so no frame is processed only to be dropped
+                self._put_waiting(images, (image_number, img), stop_shot)
+        except Exception as e:
+            self._put_waiting(images, e, stop_shot)
+
+    @staticmethod
+    def _put_waiting(images, item, stop_shot):
+        while(not stop_shot.is_set()):
+            try:
+                images.put(item, timeout=0.01)
+                return
+            except queue.Full:
+                pass
+
+    def _apply_impro_function(self, img):
+        if(self._use_opencl and self._impro_function is not None and isinstance(img, np.ndarray)):
+            # impro function gets UMat for any pixel format, not only for Bayer frames demosaiced on the device
+            img = cv2.UMat(img)
+        if(self._impro_own_window):
+            self._impro_function(img)
+            return None
+        if(self._impro_function is not None):
+            img = self._impro_function(img)
+            if(not isinstance(img, (np.ndarray, cv2.UMat))):
+                raise ValueError("The given impro_function must return a numpy array when own_window=False")
+        if(isinstance(img, cv2.UMat)):
+            # downloaded once for displaying, encoding and saving
+            img = img.get()
+        return img
+
+    def _display_frame(self, img, save_prefix):
+        if(self._image_widget is not None):
+            self._show_widget_frame(img, save_prefix)
+            return None
+        return self._show_continuous_frame(img, save_prefix)
+
+    def _show_continuous_frame(self, img, save_prefix):
+        if(img is not None):
+            cv2.imshow('camera_image', img)
+        k = _poll_key()
+        if(k == ord('s') and img is not None):
+            self._save_grabbed_image(img, save_prefix)
+        return k
+
+    def _save_grabbed_image(self, img, save_prefix):
+        path = f'{save_prefix}{time.time_ns()}.{self._save_format}'
+        # image may be a view onto the frame buffer, which is reused before writing is done
+        self._image_saver.submit(self._write_grabbed_image, path, img.copy())
+
+    def _write_grabbed_image(self, path, img):
+        if(cv2.imwrite(path, img, self._save_params)):
+            self._interact_action_widgets["StatusLabel"].value = f"Status: Grabbed image was saved to {path}"
+        else:
+            self._interact_action_widgets["StatusLabel"].value = f"Status: Grabbed image couldn't be saved to {path}"
+
+    def _show_widget_frame(self, img, save_prefix):
+        if(img is None):
+            self._last_image = None
+            return
+        if(self._save_requested.is_set()):
+            self._save_requested.clear()
+            self._save_grabbed_image(img, save_prefix)
+        # encoding runs in background overlapped with processing of the next frame, at most one image is in flight,
+        # view onto the frame buffer is copied, because the buffer is reused before encoding is done
+        if(self._encoding is not None):
+            self._encoding.result()
+        # displayed image is kept for "Save image" button, when the shot is stopped
+        self._last_image = img if img.flags.owndata else img.copy()
+        self._encoding = self._image_encoder.submit(self._push_widget_image, self._last_image)
+
+    def _push_widget_image(self, img):
+        quality = self._display_quality_widget.value
+        _, jpeg = cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        self._image_widget.value = jpeg.tobytes()
+
+    @contextlib.contextmanager
+    def _bgr_image(self, grab_result, copy=False, umat=False, converter=None):
+        # yields grabbed image in opencv bgr (or grayscale for Mono8) format, without copy=True it's a view onto the frame buffer,
+        # all references to it must be deleted before leaving the with block,
+        # with umat=True Bayer frames are uploaded to OpenCL device and demosaiced there into UMat,
+        # converter is optional pylon converter used instead of the shared one
+        pixel_type = grab_result.GetPixelType()
+        if(pixel_type in self.BAYER_CONVERSIONS):
+            # demosaicing by OpenCV is faster than by pylon converter and produces a new array anyway
+            with grab_result.GetArrayZeroCopy() as raw:
+                img = cv2.cvtColor(cv2.UMat(raw) if umat else raw, self.BAYER_CONVERSIONS[pixel_type])
+                del raw
+            yield img
+            return
+
+        # image is already in opencv format, conversion can be skipped
+        if(pixel_type in self.OPENCV_PIXEL_TYPES):
+            source = grab_result
+        else:
+            if(converter is None):
+                converter = self._get_converter()
+            source = converter.Convert(grab_result)
+
+        if(copy):
+            yield source.GetArray()
+        else:
+            with source.GetArrayZeroCopy() as img:
+                try:
+                    yield img
+                finally:
+                    del img
+
+    def _get_converter(self):
+        # converting to opencv bgr format, created on first use and reused for every grabbed frame
+        if(self._converter is None):
+            self._converter = self._create_converter()
+        return self._converter
 
-        # converting to opencv bgr format
+    @staticmethod
+    def _create_converter():
         converter = pylon.ImageFormatConverter()
         converter.OutputPixelFormat = pylon.PixelType_BGR8packed
         converter.OutputBitAlignment = pylon.OutputBitAlignment_MsbAligned
+        return converter
+
+    def _to_bgr(self, grab_result):
+        with self._bgr_image(grab_result, copy=True) as img:
+            return img
+
+    def _run_single_shot(self, window_size=None, image_folder='.'):
+        self._stop_continuous_shot()
+        self._camera.StopGrabbing()
+        save_prefix = os.path.join(image_folder, _GRABBED_IMAGE_NAME)
+
+        if(self._image_widget is not None):
+            grab_result = self._camera.GrabOne(10000)
+            if(not grab_result.GrabSucceeded()):
+                self._interact_action_widgets["StatusLabel"].value = f"Status: The single shot action has failed."
+                return
+            img = self._apply_impro_function(self._to_bgr(grab_result))
+            self._show_widget_frame(img, save_prefix)
+            self._interact_action_widgets["StatusLabel"].value = f"Status: The single shot was successfully grabbed."
+            return
 
         if(not self._impro_own_window):
-            cv2.namedWindow('camera_image', cv2.WINDOW_NORMAL | cv2.WINDOW_GUI_NORMAL)
-            if(window_size is not None):
-                cv2.resizeWindow('camera_image', window_size[0], window_size[1])
+            self._open_window(window_size)
 
         grab_result = self._camera.GrabOne(10000)
         if(not grab_result.GrabSucceeded()):
             self._interact_action_widgets["StatusLabel"].value = f"Status: The single shot action has failed."
-            cv2.destroyAllWindows()
             return
         else:
             self._interact_action_widgets["StatusLabel"].value = f"Status: The single shot was successfully grabbed."
-        image = converter.Convert(grab_result)
-        img = image.GetArray()
-
-        if(self._impro_own_window):
-            self._impro_function(img)
-        elif(self._impro_function is not None):
-            img = self._impro_function(img)
-            if(not isinstance(img, np.ndarray)):
-                cv2.destroyAllWindows()
-                raise ValueError("The given impro_function must return a numpy array when own_window=False")
-            cv2.imshow('camera_image', img)
-        else:
+        img = self._apply_impro_function(self._to_bgr(grab_result))
+        if(img is not None):
             cv2.imshow('camera_image', img)
         while True:
-            k = cv2.waitKey(1) & 0xFF
-            if(k == ord('s') and self._impro_own_window is False):
-                path = os.path.join(image_folder, 'BaslerGrabbedImage-' +
-                    str(int(datetime.datetime.now().timestamp()))+'.png')
-                cv2.imwrite(path, img)
-                self._interact_action_widgets["StatusLabel"].value = f"Status: The grabbed image was saved to {path}"
+            # nothing else happens meanwhile, so there is no need to check keys every millisecond
+            k = cv2.waitKey(30) & 0xFF
+            if(k == ord('s') and img is not None):
+                self._save_grabbed_image(img, save_prefix)
             elif k == ord('q'):
                 break
+
+    def close(self):
+        """ Stops continuous shot and closes all OpenCV windows, which are otherwise kept open between shots.
+
+        Returns
+        -------
+        None
+        """
+        self._stop_continuous_shot()
         cv2.destroyAllWindows()
 
     def save_image(self, filename):
-        """Saves grabbed image or impro function return value, if specified
+        """Saves grabbed image or impro function return value, if specified.
+        Continuous shot is stopped first, because camera can't grab one image meanwhile.
 
         Parameters
         ----------
@@ -514,19 +1077,19 @@ class BaslerOpenCVViewer:
         if self._camera is None or not self._camera.IsOpen():
             raise ValueError("Camera object {} is closed.".format(self._camera))
 
-        converter = pylon.ImageFormatConverter()
-        converter.OutputPixelFormat = pylon.PixelType_BGR8packed
-        converter.OutputBitAlignment = pylon.OutputBitAlignment_MsbAligned
-
+        self._stop_continuous_shot()
+        self._camera.StopGrabbing()
         grab_result = self._camera.GrabOne(5000)
-        image = converter.Convert(grab_result)
-        img = image.GetArray()
+        img = self._to_bgr(grab_result)
         if self._impro_function:
             img = self._impro_function(img)
-        cv2.imwrite(filename, img)
+        # OpenCV's default PNG compression level 3 is several times slower to write than level 1
+        params = [cv2.IMWRITE_PNG_COMPRESSION, 1] if filename.lower().endswith('.png') else []
+        cv2.imwrite(filename, img, params)
 
     def get_image(self):
-        """Returns grabbed image or impro function return value, if specified
+        """Returns grabbed image or impro function return value, if specified.
+        Continuous shot is stopped first, because camera can't grab one image meanwhile.
 
         Returns
         -------
@@ -535,13 +1098,10 @@ class BaslerOpenCVViewer:
         if self._camera is None or not self._camera.IsOpen():
             raise ValueError("Camera object {} is closed.".format(self._camera))
 
-        converter = pylon.ImageFormatConverter()
-        converter.OutputPixelFormat = pylon.PixelType_BGR8packed
-        converter.OutputBitAlignment = pylon.OutputBitAlignment_MsbAligned
-
+        self._stop_continuous_shot()
+        self._camera.StopGrabbing()
         grab_result = self._camera.GrabOne(5000)
-        image = converter.Convert(grab_result)
-        img = image.GetArray()
+        img = self._to_bgr(grab_result)
         if self._impro_function:
             img = self._impro_function(img)
         return img